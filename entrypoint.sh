@@ -31,7 +31,7 @@ graceful_shutdown() {
     fi
 
     # Очистка временных файлов
-    rm -f /tmp/healthcheck /tmp/*.mp4 2>/dev/null || true
+    rm -f /tmp/healthcheck /tmp/*.mp4 /dev/shm/*.mp4 2>/dev/null || true
 
     echo "$(date '+%Y-%m-%d %H:%M:%S') - Shutdown complete" >&2
 }
@@ -4,7 +4,14 @@
 import os
 import json
 import time
+import atexit
+import shutil
 import signal
+import threading
+import hashlib
+import html
+import operator
+import struct
 import logging
 import subprocess
 from datetime import datetime
@@ -15,9 +22,16 @@ import tempfile
 
 import requests
 import urllib3
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import (
+    retry, stop_after_attempt, wait_exponential, wait_random, retry_if_exception_type,
+)
 from requests.exceptions import RequestException
 
+try:
+    import orjson  # optional: faster decoding of API responses
+except ImportError:
+    orjson = None
+
 # ============================================================================
 # Logging
 # ============================================================================
@@ -36,7 +50,7 @@ logger = logging.getLogger(__name__)
 # ============================================================================
 
 
-@dataclass
+@dataclass(slots=True)
 class AppConfig:
     check_interval: int = 30
     fragment_duration_ms: int = 10000
@@ -50,6 +64,8 @@ class AppConfig:
     tg_proxy: Optional[str] = None
     # How many cycles at the end of a recording before marking it complete
     end_stable_cycles: int = 2
+    # Ceiling for the idle poll interval; <= check_interval disables backoff
+    idle_max_interval: int = 0
 
     @classmethod
     def from_env(cls) -> "AppConfig":
@@ -66,6 +82,8 @@ class AppConfig:
             c.max_fragments_per_cycle = int(v)
         if v := os.getenv("END_STABLE_CYCLES"):
             c.end_stable_cycles = int(v)
+        if v := os.getenv("IDLE_MAX_INTERVAL"):
+            c.idle_max_interval = int(v)
         c.state_file = os.getenv("STATE_FILE", c.state_file)
         c.camera_id = os.getenv("CAMERA_ID", c.camera_id)
         c.ssl_verify = os.getenv("SSL_VERIFY", "false").lower() in ("true", "1", "yes")
@@ -78,7 +96,7 @@ class AppConfig:
 # ============================================================================
 
 
-@dataclass
+@dataclass(slots=True)
 class Recording:
     id: str
     camera_id: str
@@ -87,7 +105,7 @@ class Recording:
     size: int
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordingProgress:
     recording_id: str
     next_offset_ms: int = 0          # next offset to download
@@ -105,32 +123,117 @@ class RecordingProgress:
 # ============================================================================
 
 
-def get_video_duration(file_path: str) -> Tuple[float, bool]:
-    """Returns (duration_seconds, success) via ffprobe."""
-    try:
-        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-            logger.debug(f"ffprobe: file empty or missing: {file_path}")
-            return 0.0, False
-
-        result = subprocess.run(
-            [
-                "ffprobe", "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                file_path,
-            ],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
+def _json_loads(data: bytes):
+    """Decode JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    """Encode to compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+# Resolved once so each probe execs the binary without a PATH search;
+# a missing ffprobe still surfaces as FileNotFoundError in get_video_duration.
+FFPROBE = shutil.which("ffprobe") or "ffprobe"
 
-        if result.returncode == 0 and result.stdout.strip():
-            dur = float(result.stdout.strip())
-            logger.debug(f"ffprobe: {file_path} -> {dur:.3f}s")
-            return dur, True
 
-        logger.debug(f"ffprobe error (rc={result.returncode}): {result.stderr.strip()[:200]}")
+def _probe_duration(file_path: str) -> float:
+    """Runs ffprobe on file_path. Raises RuntimeError when it yields no duration."""
+    # Uncapped on purpose: a short probe can misread the duration
+    result = subprocess.run(
+        [
+            FFPROBE, "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            file_path,
+        ],
+        capture_output=True,
+        text=True,
+        timeout=10,
+    )
+    out = result.stdout.strip()
+    if result.returncode != 0 or not out or out == "N/A":
+        raise RuntimeError(f"rc={result.returncode}: {result.stderr.strip()[:200]}")
+    return float(out)
+
+
+def _mp4_duration(file_path: str, file_size: Optional[int] = None) -> Optional[float]:
+    """
+    Reads the duration from the MP4 moov/mvhd box without spawning ffprobe.
+    Used when ffprobe fails. Returns None when there is no usable mvhd (not
+    an MP4, truncated file, fragmented MP4).
+    """
+    mvhd_duration = None
+    try:
+        with open(file_path, "rb") as f:
+            end = file_size if file_size is not None else os.fstat(f.fileno()).st_size
+            pos = 0
+            while pos + 8 <= end:
+                f.seek(pos)
+                size, box = struct.unpack(">I4s", f.read(8))
+                header_len = 8
+                if size == 1:  # 64-bit largesize follows the type
+                    size = struct.unpack(">Q", f.read(8))[0]
+                    header_len = 16
+                elif size == 0:  # box extends to the end of its container
+                    size = end - pos
+                if size < header_len:
+                    return None
+
+                if box == b"moov":
+                    # Descend: scan moov's children instead of the top level
+                    end = min(pos + size, end)
+                    pos += header_len
+                    continue
 
+                if box == b"mvhd":
+                    body = f.read(32)
+                    if body[0] == 1:
+                        timescale, duration = struct.unpack(">IQ", body[20:32])
+                        unknown = 0xFFFFFFFFFFFFFFFF
+                    else:
+                        timescale, duration = struct.unpack(">II", body[12:20])
+                        unknown = 0xFFFFFFFF
+                    if not (timescale and duration and duration != unknown):
+                        return None
+                    # Keep scanning moov: an mvex sibling may still follow
+                    mvhd_duration = duration / timescale
+                elif box == b"mvex":
+                    # Movie fragments follow; mvhd only covers the samples
+                    # inside moov, not the later moof/mdat pairs
+                    return None
+
+                pos += size
+    except (OSError, struct.error, IndexError):
+        return None
+    return mvhd_duration
+
+
+def get_video_duration(file_path: str, file_size: Optional[int] = None) -> Tuple[float, bool]:
+    """
+    Returns (duration_seconds, success) via ffprobe, or from the MP4 header
+    when ffprobe fails. file_size saves a stat() when the caller already knows it.
+    """
+    if file_size is None:
+        try:
+            file_size = os.stat(file_path).st_size
+        except OSError:
+            file_size = 0
+    if file_size == 0:
+        logger.debug("ffprobe: file empty or missing: %s", file_path)
+        return 0.0, False
+
+    try:
+        dur = _probe_duration(file_path)
+        logger.debug("ffprobe: %s -> %.3fs", file_path, dur)
+        return dur, True
+    except RuntimeError as e:
+        logger.debug("ffprobe error (%s)", e)
     except subprocess.TimeoutExpired:
         logger.warning("ffprobe timeout")
     except FileNotFoundError:
@@ -140,9 +243,31 @@ def get_video_duration(file_path: str) -> Tuple[float, bool]:
     except Exception as e:
         logger.error(f"ffprobe unexpected error: {e}")
 
+    # Not yet checked against real Synology downloads, so only a fallback
+    dur = _mp4_duration(file_path, file_size)
+    if dur is not None:
+        logger.debug("mvhd: %s -> %.3fs", file_path, dur)
+        return dur, True
+
     return 0.0, False
 
 
+def _fragment_tmp_dir(min_free_bytes: int) -> str:
+    """
+    /dev/shm (tmpfs) when it is writable and has room for min_free_bytes,
+    so fragments are staged in RAM instead of on disk; /tmp otherwise.
+    Docker's default /dev/shm is only 64 MB, hence the free-space check.
+    """
+    shm = "/dev/shm"
+    try:
+        st = os.statvfs(shm)
+        if os.access(shm, os.W_OK) and st.f_bavail * st.f_frsize >= min_free_bytes:
+            return shm
+    except OSError:
+        pass
+    return "/tmp"
+
+
 # ============================================================================
 # Synology API
 # ============================================================================
@@ -151,6 +276,33 @@ def get_video_duration(file_path: str) -> Tuple[float, bool]:
 class SynologyAPI:
     # Tested recording API version
     RECORDING_API_VERSION = "6"
+    # Large enough that BufferedWriter passes chunks straight to write(2);
+    # same size as the upload side (_MultipartBody.CHUNK_SIZE)
+    DOWNLOAD_CHUNK_SIZE = 256 * 1024
+    # How long the camera list is reused before it is fetched again
+    CAMERAS_TTL_S = 600
+    # Re-login after this long even if the sid still seems valid
+    SESSION_TTL_S = 600
+
+    # Static parts of the query strings; only the volatile keys are added per call
+    _CAMERA_LIST_PARAMS = {
+        "api": "SYNO.SurveillanceStation.Camera",
+        "method": "List",
+        "version": "9",
+    }
+    _RECORDING_LIST_PARAMS = {
+        "api": "SYNO.SurveillanceStation.Recording",
+        "method": "List",
+        "version": RECORDING_API_VERSION,
+        "offset": "0",
+        "blIncludeThumb": "false",
+    }
+    _RECORDING_DOWNLOAD_PARAMS = {
+        "api": "SYNO.SurveillanceStation.Recording",
+        "method": "Download",
+        "version": RECORDING_API_VERSION,
+        "mountId": "0",
+    }
 
     def __init__(self, config: AppConfig):
         syno_ip = os.getenv("SYNO_IP")
@@ -159,40 +311,51 @@ class SynologyAPI:
         self.ssl_verify = config.ssl_verify
         self.config = config
 
+        self._login_params = {
+            "api": "SYNO.API.Auth",
+            "version": "7",
+            "method": "login",
+            "account": os.getenv("SYNO_USER"),
+            "passwd": os.getenv("SYNO_PASS"),
+            "session": "SurveillanceStation",
+            "format": "cookie",
+        }
+        if otp := os.getenv("SYNO_OTP"):
+            self._login_params["otp_code"] = otp
+
         self.session = requests.Session()
         self.session.verify = self.ssl_verify
         if not self.ssl_verify:
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
         self.sid: Optional[str] = None
-        self.last_login: Optional[float] = None
+        # TTL bookkeeping uses time.monotonic(), immune to wall-clock jumps
+        self._session_expires_at = 0.0
         self.cameras_cache: Dict[str, Dict] = {}
+        # -inf, not 0.0: monotonic() may be below the TTL right after boot
+        self._cameras_fetched_at = float("-inf")
+        # Digest of the last successful Recording.List body and its parsed result
+        self._recordings_digest: Optional[bytes] = None
+        self._recordings_result: List[Recording] = []
+        # Single reusable fragment file: truncated and rewritten per download
+        # instead of creating/unlinking a new temp file for every fragment.
+        self._fragment_path: Optional[str] = None
+        atexit.register(self.close)
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type(RequestException),
+        wait=wait_exponential(multiplier=1, min=2, max=10) + wait_random(0, 1),
+        # ValueError: _json_loads on a non-JSON 200 (e.g. DSM still starting up)
+        retry=retry_if_exception_type((RequestException, ValueError)),
     )
     def login(self) -> bool:
-        params = {
-            "api": "SYNO.API.Auth",
-            "version": "7",
-            "method": "login",
-            "account": os.getenv("SYNO_USER"),
-            "passwd": os.getenv("SYNO_PASS"),
-            "session": "SurveillanceStation",
-            "format": "cookie",
-        }
-        if otp := os.getenv("SYNO_OTP"):
-            params["otp_code"] = otp
-
-        response = self.session.get(self.base_url, params=params, timeout=15)
+        response = self.session.get(self.base_url, params=self._login_params, timeout=15)
         response.raise_for_status()
-        data = response.json()
+        data = _json_loads(response.content)
 
         if data.get("success"):
             self.sid = data["data"]["sid"]
-            self.last_login = time.time()
+            self._session_expires_at = time.monotonic() + self.SESSION_TTL_S
             logger.info("Synology: auth OK")
             return True
 
@@ -200,73 +363,85 @@ class SynologyAPI:
         return False
 
     def ensure_session(self) -> bool:
-        if not self.sid or not self.last_login or time.time() - self.last_login > 600:
-            return self.login()
-        return True
+        # Cheap sid check first; the clock is only read for a live session
+        if self.sid and time.monotonic() < self._session_expires_at:
+            return True
+        return self.login()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=5))
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=5) + wait_random(0, 1),
+    )
     def get_cameras(self) -> Dict[str, Dict]:
+        if self.cameras_cache and time.monotonic() - self._cameras_fetched_at < self.CAMERAS_TTL_S:
+            return self.cameras_cache
         if not self.ensure_session():
             return {}
 
         response = self.session.get(
             self.base_url,
-            params={
-                "api": "SYNO.SurveillanceStation.Camera",
-                "method": "List",
-                "version": "9",
-                "_sid": self.sid,
-            },
+            params={**self._CAMERA_LIST_PARAMS, "_sid": self.sid},
             timeout=15,
         )
         response.raise_for_status()
-        data = response.json()
+        data = _json_loads(response.content)
 
         if data.get("success"):
             cameras = data.get("data", {}).get("cameras", [])
             self.cameras_cache = {
                 str(cam["id"]): {
                     "id": cam["id"],
-                    "name": cam.get("newName", cam.get("name", f"Camera {cam['id']}")),
+                    # Fallback name is only formatted when both are missing/empty
+                    "name": cam.get("newName") or cam.get("name") or f"Camera {cam['id']}",
                 }
                 for cam in cameras
             }
+            self._cameras_fetched_at = time.monotonic()
             logger.info(f"Cameras loaded: {[c['name'] for c in self.cameras_cache.values()]}")
             return self.cameras_cache
 
         logger.warning(f"get_cameras failed: {data}")
         return {}
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=5))
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=5) + wait_random(0, 1),
+    )
     def get_recordings(
         self,
         camera_id: Optional[str] = None,
         limit: int = 30,
         from_time: Optional[int] = None,
         to_time: Optional[int] = None,
-    ) -> List[Recording]:
+    ) -> Optional[List[Recording]]:
+        """Recordings in the window; None when the list could not be fetched."""
         if not self.ensure_session():
-            return []
+            return None
 
         current_time = int(time.time())
         params = {
-            "api": "SYNO.SurveillanceStation.Recording",
-            "method": "List",
-            "version": self.RECORDING_API_VERSION,
+            **self._RECORDING_LIST_PARAMS,
             "_sid": self.sid,
-            "offset": "0",
             "limit": str(limit),
             "fromTime": str(from_time if from_time is not None else current_time - 300),
             "toTime": str(to_time if to_time is not None else current_time),
-            "blIncludeThumb": "false",
         }
         if camera_id:
             params["cameraIds"] = str(camera_id)
 
         response = self.session.get(self.base_url, params=params, timeout=20)
         response.raise_for_status()
-        data = response.json()
-        logger.debug(f"get_recordings raw: {json.dumps(data)[:500]}")
+
+        # DSM sends no ETag, so compare the body itself: an identical list
+        # (the common idle case) is returned without parsing it again.
+        digest = hashlib.blake2b(response.content, digest_size=8).digest()
+        if digest == self._recordings_digest:
+            logger.debug("get_recordings: unchanged (%d recordings)", len(self._recordings_result))
+            return self._recordings_result
+
+        data = _json_loads(response.content)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("get_recordings raw: %r", response.content[:500])
 
         if data.get("success"):
             recordings = []
@@ -295,50 +470,48 @@ class SynologyAPI:
                         size=int(rec.get("sizeByte") or rec.get("size") or 0),
                     ))
                     logger.debug(
-                        f"  rec id={rec['id']} duration={duration}s "
-                        f"start={start_time} path={rec.get('filePath', '')}"
+                        "  rec id=%s duration=%ss start=%s path=%s",
+                        rec["id"], duration, start_time, rec.get("filePath", ""),
                     )
                 except Exception as e:
                     logger.warning(f"Recording parse error {rec.get('id')}: {e}")
 
             logger.info(f"get_recordings: {len(recordings)} recordings found")
+            self._recordings_digest = digest
+            self._recordings_result = recordings
             return recordings
 
         error_code = data.get("error", {}).get("code", "unknown")
         logger.warning(f"get_recordings API error code={error_code}")
-        return []
+        # Most list errors are session errors (105/106/119); log in again next call
+        self.sid = None
+        return None
 
     def download_fragment(
         self, recording_id: str, offset_ms: int, duration_ms: int
-    ) -> Optional[str]:
-        """Download a fragment. Returns temp file path or None on failure."""
+    ) -> Optional[Tuple[str, int]]:
+        """
+        Download a fragment. Returns (temp file path, size in bytes) or None on
+        failure; the size is counted while writing so callers need no stat().
+        """
         if not self.ensure_session():
             return None
 
         temp_path = None
         try:
-            tf = tempfile.NamedTemporaryFile(
-                suffix=f"_rec{recording_id}_off{offset_ms}.mp4",
-                delete=False,
-                dir="/tmp",
-            )
-            tf.close()
-            temp_path = tf.name
-
+            # Inside the try: a full or read-only tmp dir must not escape
+            temp_path = self._fragment_buffer()
             params = {
-                "api": "SYNO.SurveillanceStation.Recording",
-                "method": "Download",
-                "version": self.RECORDING_API_VERSION,
+                **self._RECORDING_DOWNLOAD_PARAMS,
                 "_sid": self.sid,
                 "id": recording_id,
-                "mountId": "0",
                 "offsetTimeMs": str(offset_ms),
                 "playTimeMs": str(duration_ms),
             }
 
             logger.debug(
-                f"download_fragment: rec={recording_id} offset={offset_ms}ms "
-                f"duration={duration_ms}ms"
+                "download_fragment: rec=%s offset=%sms duration=%sms",
+                recording_id, offset_ms, duration_ms,
             )
 
             response = self.session.get(
@@ -349,79 +522,104 @@ class SynologyAPI:
                 logger.warning(
                     f"download_fragment: HTTP {response.status_code} for rec={recording_id}"
                 )
-                os.remove(temp_path)
                 return None
 
             content_type = response.headers.get("Content-Type", "")
-            logger.debug(f"download_fragment: Content-Type={content_type}")
+            logger.debug("download_fragment: Content-Type=%s", content_type)
 
             # If Synology returns a JSON error instead of video data, bail out
             if "application/json" in content_type:
                 body = response.text[:300]
                 logger.warning(f"download_fragment: got JSON instead of video: {body}")
-                os.remove(temp_path)
                 return None
 
+            # Counted while writing, so the size needs no stat() afterwards
+            file_size = 0
             try:
                 with open(temp_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=32768):
+                    for chunk in response.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
                         if chunk:
                             f.write(chunk)
+                            file_size += len(chunk)
             except RequestException as e:
                 # IncompleteRead / ChunkedEncodingError — partial download.
                 # If we got enough data (> 100 KB), the MP4 may still be valid.
-                file_size = os.path.getsize(temp_path) if os.path.exists(temp_path) else 0
                 if file_size > 102400:
                     logger.warning(
                         f"download_fragment: partial download {file_size/1024:.0f} KB "
                         f"(IncompleteRead) for rec={recording_id} offset={offset_ms}ms "
                         f"— trying to use partial file"
                     )
-                    return temp_path
+                    return temp_path, file_size
                 logger.error(
                     f"download_fragment: IncompleteRead too small ({file_size} B) "
                     f"rec={recording_id}: {e}"
                 )
-                self._cleanup_temp(temp_path)
+                self.release_fragment(temp_path)
                 return None
 
-            file_size = os.path.getsize(temp_path)
             logger.debug(
-                f"download_fragment: rec={recording_id} offset={offset_ms}ms "
-                f"-> {file_size/1024:.1f} KB"
+                "download_fragment: rec=%s offset=%sms -> %.1f KB",
+                recording_id, offset_ms, file_size / 1024,
             )
 
             if file_size > 0:
-                return temp_path
+                return temp_path, file_size
 
             logger.info(
                 f"download_fragment: empty file for rec={recording_id} offset={offset_ms}ms "
                 f"(live edge or end of recording)"
             )
-            os.remove(temp_path)
             return None
 
         except RequestException as e:
             logger.error(f"download_fragment network error rec={recording_id}: {e}")
             if "401" in str(e) or "session" in str(e).lower():
                 self.sid = None
-            self._cleanup_temp(temp_path)
+            self.release_fragment(temp_path)
             return None
         except Exception as e:
             logger.error(f"download_fragment unexpected error rec={recording_id}: {e}")
-            self._cleanup_temp(temp_path)
+            self.release_fragment(temp_path)
             return None
 
-    def _cleanup_temp(self, path: Optional[str]) -> None:
+    def _fragment_buffer(self) -> str:
+        """
+        Path of the reusable fragment file, created on first use. No exists()
+        check per call: open(..., "wb") recreates the file if it was removed.
+        """
+        if self._fragment_path is None:
+            tmp_dir = _fragment_tmp_dir(TelegramBot.MAX_FILE_SIZE)
+            tf = tempfile.NamedTemporaryFile(suffix="_fragment.mp4", delete=False, dir=tmp_dir)
+            tf.close()
+            self._fragment_path = tf.name
+        return self._fragment_path
+
+    def release_fragment(self, path: Optional[str]) -> None:
+        """Drop the fragment data but keep the file for the next download."""
         if path:
             try:
-                os.remove(path)
+                os.truncate(path, 0)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        if self._fragment_path:
+            try:
+                os.remove(self._fragment_path)
             except OSError:
                 pass
+            self._fragment_path = None
 
     def get_camera_name(self, camera_id: str) -> str:
-        if not self.cameras_cache:
-            self.get_cameras()
+        """Name from the camera list, refreshed at most every CAMERAS_TTL_S."""
+        if time.monotonic() - self._cameras_fetched_at >= self.CAMERAS_TTL_S:
+            try:
+                self.get_cameras()
+            except Exception as e:
+                logger.warning(f"Could not refresh camera list: {e}")
+            # On failure the previous names are kept until the next TTL
+            self._cameras_fetched_at = time.monotonic()
         cam = self.cameras_cache.get(str(camera_id))
         return cam["name"] if cam else f"Camera {camera_id}"
 
@@ -431,6 +629,51 @@ class SynologyAPI:
 # ============================================================================
 
 
+class _MultipartBody:
+    """
+    multipart/form-data body that streams the file part from disk.
+
+    requests' files= reads the whole file into memory to build the body;
+    this yields it in chunks instead, with a known Content-Length.
+    """
+
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, fields: Dict[str, object], file_field: str, file_path: str,
+                 file_type: str = "video/mp4", file_size: Optional[int] = None):
+        boundary = os.urandom(16).hex()
+        head = []
+        for name, value in fields.items():
+            if isinstance(value, bool):
+                value = "true" if value else "false"
+            head.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                f"{value}\r\n"
+            )
+        head.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+            f'filename="{os.path.basename(file_path)}"\r\n'
+            f"Content-Type: {file_type}\r\n\r\n"
+        )
+        self._head = "".join(head).encode()
+        self._tail = f"\r\n--{boundary}--\r\n".encode()
+        self._path = file_path
+        if file_size is None:
+            file_size = os.path.getsize(file_path)
+        self._length = len(self._head) + file_size + len(self._tail)
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        yield self._head
+        with open(self._path, "rb") as f:
+            while chunk := f.read(self.CHUNK_SIZE):
+                yield chunk
+        yield self._tail
+
+
 class TelegramBot:
     MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
 
@@ -438,6 +681,15 @@ class TelegramBot:
         self.token = os.getenv("TG_TOKEN")
         self.chat_id = os.getenv("TG_CHAT_ID")
         self.base_url = f"https://api.telegram.org/bot{self.token}"
+        self._get_me_url = f"{self.base_url}/getMe"
+        self._send_message_url = f"{self.base_url}/sendMessage"
+        self._send_video_url = f"{self.base_url}/sendVideo"
+        # Static sendVideo form fields; only the caption changes per fragment
+        self._video_data = {
+            "chat_id": self.chat_id,
+            "supports_streaming": True,
+            "parse_mode": "HTML",
+        }
         self.bot_name: Optional[str] = None
         self.session = requests.Session()
         if proxy:
@@ -445,9 +697,12 @@ class TelegramBot:
             logger.info(f"Telegram: using proxy {proxy}")
         self._check_connection()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=5))
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=5) + wait_random(0, 1),
+    )
     def _check_connection(self) -> None:
-        response = self.session.get(f"{self.base_url}/getMe", timeout=10)
+        response = self.session.get(self._get_me_url, timeout=10)
         response.raise_for_status()
         data = response.json()
         if data.get("ok"):
@@ -458,13 +713,13 @@ class TelegramBot:
 
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=5),
+        wait=wait_exponential(multiplier=1, min=2, max=5) + wait_random(0, 1),
         retry=retry_if_exception_type(RequestException),
     )
     def send_message(self, text: str) -> bool:
         try:
             response = self.session.post(
-                f"{self.base_url}/sendMessage",
+                self._send_message_url,
                 json={"chat_id": self.chat_id, "text": text, "parse_mode": "HTML"},
                 timeout=10,
             )
@@ -473,8 +728,11 @@ class TelegramBot:
             logger.error(f"send_message error: {e}")
             return False
 
-    def send_video(self, video_path: str, caption: str = "") -> bool:
-        file_size = os.path.getsize(video_path)
+    def send_video(self, video_path: str, caption: str = "",
+                   file_size: Optional[int] = None) -> bool:
+        """file_size saves a stat() when the caller already knows it."""
+        if file_size is None:
+            file_size = os.path.getsize(video_path)
         if file_size > self.MAX_FILE_SIZE:
             logger.warning(f"File too large for Telegram: {file_size/1024/1024:.1f} MB")
             return False
@@ -483,18 +741,16 @@ class TelegramBot:
 
         for attempt in range(3):
             try:
-                with open(video_path, "rb") as f:
-                    response = self.session.post(
-                        f"{self.base_url}/sendVideo",
-                        files={"video": f},
-                        data={
-                            "chat_id": self.chat_id,
-                            "caption": caption,
-                            "supports_streaming": True,
-                            "parse_mode": "HTML",
-                        },
-                        timeout=180,
-                    )
+                body = _MultipartBody(
+                    {**self._video_data, "caption": caption}, "video", video_path,
+                    file_size=file_size,
+                )
+                response = self.session.post(
+                    self._send_video_url,
+                    data=body,
+                    headers={"Content-Type": body.content_type},
+                    timeout=180,
+                )
 
                 if response.status_code == 200 and response.json().get("ok"):
                     logger.info("Video sent OK")
@@ -525,11 +781,27 @@ class TelegramBot:
 # ============================================================================
 
 
+# Persisted RecordingProgress fields; recording_id is the dict key
+_PROGRESS_FIELDS = (
+    "next_offset_ms",
+    "fragments_sent",
+    "consecutive_fails",
+    "is_completed",
+    "known_duration_ms",
+    "cycles_at_end",
+    "last_seen_time",
+)
+_progress_values = operator.attrgetter(*_PROGRESS_FIELDS)
+
+
 class StateManager:
     def __init__(self, config: AppConfig):
         self.state_file = Path(config.state_file)
+        self.lookback_minutes = config.lookback_minutes
         self.progress: Dict[str, RecordingProgress] = {}
         self.completed_ids: Set[str] = set()
+        # Set by in-memory mutations; flush() writes only when it is set
+        self._dirty = False
         self._load()
 
     def _load(self) -> None:
@@ -537,21 +809,16 @@ class StateManager:
             logger.info("No state file, starting fresh")
             return
         try:
-            with open(self.state_file) as f:
-                state = json.load(f)
+            state = _json_loads(self.state_file.read_bytes())
 
             self.completed_ids = set(state.get("completed_ids", []))
             for rec_id, d in state.get("progress", {}).items():
                 self.progress[rec_id] = RecordingProgress(
                     recording_id=rec_id,
-                    next_offset_ms=d.get("next_offset_ms", 0),
-                    fragments_sent=d.get("fragments_sent", 0),
-                    consecutive_fails=d.get("consecutive_fails", 0),
-                    is_completed=d.get("is_completed", False),
-                    known_duration_ms=d.get("known_duration_ms", 0),
-                    cycles_at_end=d.get("cycles_at_end", 0),
-                    last_seen_time=d.get("last_seen_time", time.time()),
+                    **{k: d[k] for k in _PROGRESS_FIELDS if k in d},
                 )
+                if self.progress[rec_id].is_completed:
+                    self.completed_ids.add(rec_id)
             logger.info(
                 f"State loaded: {len(self.progress)} progress entries, "
                 f"{len(self.completed_ids)} completed"
@@ -567,36 +834,40 @@ class StateManager:
             state = {
                 "completed_ids": list(self.completed_ids),
                 "progress": {
-                    rec_id: {
-                        "next_offset_ms": p.next_offset_ms,
-                        "fragments_sent": p.fragments_sent,
-                        "consecutive_fails": p.consecutive_fails,
-                        "is_completed": p.is_completed,
-                        "known_duration_ms": p.known_duration_ms,
-                        "cycles_at_end": p.cycles_at_end,
-                        "last_seen_time": p.last_seen_time,
-                    }
+                    rec_id: dict(zip(_PROGRESS_FIELDS, _progress_values(p)))
                     for rec_id, p in self.progress.items()
                 },
                 "updated_at": datetime.now().isoformat(),
             }
             tmp = self.state_file.with_suffix(".tmp")
-            with open(tmp, "w") as f:
-                json.dump(state, f, indent=2, ensure_ascii=False)
+            with open(tmp, "wb") as f:
+                f.write(_json_dumps(state))
+                f.flush()
+                os.fsync(f.fileno())
             tmp.replace(self.state_file)
+            self._dirty = False
         except Exception as e:
             logger.error(f"State save error: {e}")
 
+    def mark_dirty(self) -> None:
+        self._dirty = True
+
+    def flush(self) -> None:
+        """Write state only if something changed since the last save."""
+        if self._dirty:
+            self.save()
+
     def is_completed(self, recording_id: str) -> bool:
-        return recording_id in self.completed_ids or (
-            recording_id in self.progress and self.progress[recording_id].is_completed
-        )
+        # mark_completed and _load keep completed_ids in sync with
+        # progress[...].is_completed, so the set alone is authoritative.
+        return recording_id in self.completed_ids
 
     def get_or_create(self, recording: Recording) -> RecordingProgress:
         rec_id = recording.id
         if rec_id not in self.progress:
             logger.info(f"New recording: id={rec_id} duration={recording.duration}s")
             self.progress[rec_id] = RecordingProgress(recording_id=rec_id)
+            self._dirty = True
 
         p = self.progress[rec_id]
         p.last_seen_time = time.time()
@@ -611,15 +882,16 @@ class StateManager:
             p.consecutive_fails = 0
             p.cycles_at_end = 0
             logger.debug(
-                f"mark_sent: rec={recording_id} offset {old_offset}->{new_offset_ms}ms "
-                f"(total sent: {p.fragments_sent})"
+                "mark_sent: rec=%s offset %s->%sms (total sent: %s)",
+                recording_id, old_offset, new_offset_ms, p.fragments_sent,
             )
         self.save()
 
     def mark_failed(self, recording_id: str) -> None:
+        # Losing a failure count on crash is harmless; flushed with the cycle
         if recording_id in self.progress:
             self.progress[recording_id].consecutive_fails += 1
-        self.save()
+            self._dirty = True
 
     def mark_completed(self, recording_id: str, reason: str = "") -> None:
         if recording_id in self.progress:
@@ -628,24 +900,34 @@ class StateManager:
         self.save()
         logger.info(f"Recording {recording_id} completed. Reason: {reason}")
 
-    def get_active_ids(self) -> List[str]:
-        return [r for r, p in self.progress.items() if not p.is_completed]
+    def has_active(self) -> bool:
+        # Stops at the first active entry; no list is built
+        return any(not p.is_completed for p in self.progress.values())
 
     def cleanup_old(self, max_age_hours: int = 24) -> None:
         cutoff = time.time() - max_age_hours * 3600
-        old = [r for r, p in self.progress.items() if p.last_seen_time < cutoff]
-        for r in old:
-            del self.progress[r]
-        if old:
-            logger.info(f"Cleaned up {len(old)} old recording entries")
-        self.save()
+        kept = {r: p for r, p in self.progress.items() if p.last_seen_time >= cutoff}
+        removed = self.progress.keys() - kept.keys()
+        self.progress = kept
+        if removed:
+            # Otherwise completed_ids (and the state file) only ever grows.
+            # Ids that never had a progress entry are left alone. Only safe
+            # when the NAS can no longer list them: with a lookback longer
+            # than max_age_hours they would be sent again.
+            if max_age_hours * 3600 > self.lookback_minutes * 60 + POLL_SLACK_S:
+                self.completed_ids -= removed
+            logger.info(f"Cleaned up {len(removed)} old recording entries")
+            self._dirty = True
 
     def stats(self) -> Dict[str, int]:
-        active = self.get_active_ids()
+        active = fragments_total = 0
+        for p in self.progress.values():
+            active += not p.is_completed
+            fragments_total += p.fragments_sent
         return {
-            "active": len(active),
+            "active": active,
             "completed": len(self.completed_ids),
-            "fragments_total": sum(p.fragments_sent for p in self.progress.values()),
+            "fragments_total": fragments_total,
         }
 
 
@@ -654,6 +936,16 @@ class StateManager:
 # ============================================================================
 
 MIN_VALID_FRAGMENT_S = 0.5   # Shorter than this = no data yet at live edge
+POLL_SLACK_S = 60            # Overlap with the previous poll window when idle
+
+
+_CAPTION_TEMPLATE = (
+    "<b>Motion detected (fragment {fragment_num})</b>\n"
+    "<b>Date:</b> {date}\n"
+    "<b>Time:</b> {time}\n"
+    "<b>Camera:</b> {camera}\n"
+    "<b>Position:</b> {start:.0f}s - {end:.0f}s"
+)
 
 
 def _format_caption(
@@ -663,16 +955,51 @@ def _format_caption(
     offset_s: float,
     duration_s: float,
 ) -> str:
-    ts = datetime.fromtimestamp(recording.start_time + offset_s)
-    return (
-        f"<b>Motion detected (fragment {fragment_num})</b>\n"
-        f"<b>Date:</b> {ts.strftime('%d.%m.%Y')}\n"
-        f"<b>Time:</b> {ts.strftime('%H:%M:%S')}\n"
-        f"<b>Camera:</b> {camera_name}\n"
-        f"<b>Position:</b> {offset_s:.0f}s - {offset_s + duration_s:.0f}s"
+    """camera_name is inserted as-is and must already be HTML-escaped."""
+    date, clock = time.strftime(
+        "%d.%m.%Y %H:%M:%S", time.localtime(recording.start_time + offset_s)
+    ).split(" ")
+    return _CAPTION_TEMPLATE.format(
+        fragment_num=fragment_num,
+        date=date,
+        time=clock,
+        camera=camera_name,
+        start=offset_s,
+        end=offset_s + duration_s,
     )
 
 
+def poll_window(
+    state: StateManager,
+    config: AppConfig,
+    current_time: int,
+    last_poll: Optional[int],
+) -> Tuple[int, int]:
+    """
+    Returns (from_time, to_time) for the next get_recordings call.
+
+    While recordings are in progress the full lookback window is used so they
+    keep being returned. When idle, only recordings started since the previous
+    successful poll can be new, so the window is narrowed to it (plus
+    POLL_SLACK_S) and the NAS stops re-listing already completed recordings
+    every cycle. last_poll must only advance after a successful list.
+    """
+    from_time = current_time - config.lookback_minutes * 60
+    if last_poll is not None and not state.has_active():
+        from_time = max(from_time, last_poll - POLL_SLACK_S)
+    return from_time, current_time
+
+
+def idle_interval(config: AppConfig, idle_cycles: int) -> int:
+    """
+    Poll interval after idle_cycles consecutive cycles with no recordings:
+    check_interval doubled per idle cycle, capped at idle_max_interval.
+    """
+    if idle_cycles == 0 or config.idle_max_interval <= config.check_interval:
+        return config.check_interval
+    return min(config.check_interval * 2 ** min(idle_cycles, 16), config.idle_max_interval)
+
+
 def process_recording(
     synology: SynologyAPI,
     telegram: TelegramBot,
@@ -699,11 +1026,12 @@ def process_recording(
     api_duration_ms = recording.duration * 1000
     if api_duration_ms > progress.known_duration_ms:
         logger.debug(
-            f"rec={recording.id}: duration grew "
-            f"{progress.known_duration_ms}->{api_duration_ms}ms, resetting end counter"
+            "rec=%s: duration grew %s->%sms, resetting end counter",
+            recording.id, progress.known_duration_ms, api_duration_ms,
         )
         progress.known_duration_ms = api_duration_ms
         progress.cycles_at_end = 0  # duration grew -> not stable yet
+        state.mark_dirty()
 
     # Check stable-end completion
     if (
@@ -726,15 +1054,15 @@ def process_recording(
         # Per-call fragment limit
         if fragments_this_call >= config.max_fragments_per_cycle:
             logger.debug(
-                f"rec={recording.id}: hit max_fragments_per_cycle={config.max_fragments_per_cycle}, "
-                f"continuing next cycle"
+                "rec=%s: hit max_fragments_per_cycle=%d, continuing next cycle",
+                recording.id, config.max_fragments_per_cycle,
             )
             break
 
         # Check if we've reached the end of available data
         if progress.known_duration_ms > 0 and progress.next_offset_ms >= progress.known_duration_ms:
             progress.cycles_at_end += 1
-            state.save()
+            state.mark_dirty()
             logger.info(
                 f"rec={recording.id}: at end "
                 f"(offset={progress.next_offset_ms}ms >= duration={progress.known_duration_ms}ms, "
@@ -756,11 +1084,11 @@ def process_recording(
             f"(known_duration={progress.known_duration_ms}ms)"
         )
 
-        fragment_file = synology.download_fragment(recording.id, progress.next_offset_ms, request_ms)
+        fragment = synology.download_fragment(recording.id, progress.next_offset_ms, request_ms)
 
-        if not fragment_file:
+        if not fragment:
             progress.consecutive_fails += 1
-            state.save()
+            state.mark_dirty()
             logger.warning(
                 f"rec={recording.id}: download failed "
                 f"(consecutive_fails={progress.consecutive_fails})"
@@ -771,9 +1099,10 @@ def process_recording(
                 )
             break
 
+        # Size was counted during the download; nothing below stats the file
+        fragment_file, file_size = fragment
         try:
-            actual_duration, ok = get_video_duration(fragment_file)
-            file_size = os.path.getsize(fragment_file)
+            actual_duration, ok = get_video_duration(fragment_file, file_size)
 
             logger.info(
                 f"rec={recording.id}: fragment downloaded "
@@ -788,7 +1117,7 @@ def process_recording(
                     f"{MIN_VALID_FRAGMENT_S}s) — at live edge, waiting next cycle"
                 )
                 progress.cycles_at_end += 1
-                state.save()
+                state.mark_dirty()
                 break
 
             # Valid fragment — reset failure counter
@@ -831,7 +1160,7 @@ def process_recording(
                     f"rec={recording.id}: inferred duration={actual_duration_ms}ms "
                     f"from oversized fragment (short recording)"
                 )
-                state.save()
+                state.mark_dirty()
 
             caption = _format_caption(
                 recording,
@@ -841,7 +1170,7 @@ def process_recording(
                 actual_duration,
             )
 
-            if telegram.send_video(fragment_file, caption):
+            if telegram.send_video(fragment_file, caption, file_size=file_size):
                 # Advance by actual measured duration (from ffprobe)
                 new_offset = progress.next_offset_ms + int(actual_duration * 1000)
                 state.mark_sent(recording.id, new_offset)
@@ -854,10 +1183,7 @@ def process_recording(
                 break
 
         finally:
-            try:
-                os.remove(fragment_file)
-            except OSError:
-                pass
+            synology.release_fragment(fragment_file)
 
     return sent
 
@@ -890,11 +1216,8 @@ def main() -> None:
     telegram = TelegramBot(proxy=config.tg_proxy)
     state = StateManager(config)
 
-    try:
-        synology.get_cameras()
-    except Exception as e:
-        logger.warning(f"Could not fetch camera list (non-fatal): {e}")
-    camera_name = synology.get_camera_name(config.camera_id)
+    # Escaped once here; captions and messages are sent with parse_mode=HTML
+    camera_name = html.escape(synology.get_camera_name(config.camera_id))
 
     s = state.stats()
     telegram.send_message(
@@ -906,61 +1229,80 @@ def main() -> None:
         f"Active recordings in state: {s['active']}"
     )
 
-    shutdown_requested = False
+    shutdown = threading.Event()
     fragments_this_session = 0
-    last_cleanup = time.time()
-    start_time = time.time()
+    # Intervals and uptime on the monotonic clock; wall time only for API/state
+    last_cleanup = start_time = time.monotonic()
     healthcheck = Path("/tmp/healthcheck")
     cycle = 0
+    last_poll: Optional[int] = None
+    idle_cycles = 0
+    interval = config.check_interval
 
     def signal_handler(signum, frame):
-        nonlocal shutdown_requested
         logger.info(f"Signal {signum} received, shutting down...")
-        shutdown_requested = True
+        shutdown.set()
 
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
 
     logger.info("Monitoring started")
 
-    while not shutdown_requested:
+    while not shutdown.is_set():
         try:
             cycle += 1
             current_time = int(time.time())
-            from_time = current_time - config.lookback_minutes * 60
+            from_time, to_time = poll_window(state, config, current_time, last_poll)
 
-            logger.debug(f"--- Cycle {cycle} ---")
+            logger.debug("--- Cycle %d --- window=%d..%d", cycle, from_time, to_time)
 
             recordings = synology.get_recordings(
                 camera_id=config.camera_id,
                 limit=50,
                 from_time=from_time,
-                to_time=current_time,
+                to_time=to_time,
             )
+            # Only a successful list moves the window forward; after a failed
+            # poll the next window still starts at the last successful one
+            poll_ok = recordings is not None
+            if poll_ok:
+                last_poll = current_time
+            else:
+                recordings = []
 
             seen_ids = {r.id for r in recordings}
+            # Cached; only hits the API once CAMERAS_TTL_S has passed
+            camera_name = html.escape(synology.get_camera_name(config.camera_id))
 
             for recording in recordings:
-                if shutdown_requested:
+                if shutdown.is_set():
                     break
                 if state.is_completed(recording.id):
-                    logger.debug(f"rec={recording.id}: already completed, skipping")
+                    logger.debug("rec=%s: already completed, skipping", recording.id)
                     continue
                 n = process_recording(synology, telegram, state, recording, camera_name, config)
                 fragments_this_session += n
 
-            # Mark recordings that disappeared from the API as completed
-            for rec_id in state.get_active_ids():
-                if rec_id not in seen_ids:
-                    p = state.progress.get(rec_id)
-                    if p and time.time() - p.last_seen_time > 120:
-                        state.mark_completed(
-                            rec_id,
-                            reason="disappeared from API for >120s",
-                        )
+            # Mark recordings that disappeared from the API as completed;
+            # collected first because mark_completed mutates the entries.
+            # last_seen_time is persisted, so this compares wall-clock time.
+            # A failed poll says nothing about what disappeared.
+            disappeared_cutoff = time.time() - 120
+            disappeared = [
+                rec_id for rec_id, p in state.progress.items()
+                if not p.is_completed
+                and rec_id not in seen_ids
+                and p.last_seen_time < disappeared_cutoff
+            ] if poll_ok else []
+            for rec_id in disappeared:
+                state.mark_completed(
+                    rec_id,
+                    reason="disappeared from API for >120s",
+                )
 
             # Periodic cleanup and stats
-            if time.time() - last_cleanup > 300:
+            now = time.monotonic()
+            if now - last_cleanup > 300:
                 state.cleanup_old(config.cleanup_max_age_hours)
                 s = state.stats()
                 logger.info(
@@ -968,23 +1310,32 @@ def main() -> None:
                     f"fragments_total={s['fragments_total']} "
                     f"session_sent={fragments_this_session}"
                 )
-                last_cleanup = time.time()
+                last_cleanup = now
 
+            state.flush()
             healthcheck.touch()
 
-            # Sleep in small increments to allow fast signal handling
-            for _ in range(config.check_interval):
-                if shutdown_requested:
-                    break
-                time.sleep(1)
+            # Back off while the camera is quiet; any recording resets it.
+            # A failed poll is not evidence of quiet and leaves it unchanged.
+            if recordings or state.has_active():
+                idle_cycles = 0
+            elif poll_ok:
+                idle_cycles += 1
+            next_interval = idle_interval(config, idle_cycles)
+            if next_interval != interval:
+                logger.info(f"Poll interval {interval}s -> {next_interval}s")
+                interval = next_interval
+
+            # Returns immediately when a signal sets the event
+            shutdown.wait(interval)
 
         except KeyboardInterrupt:
-            shutdown_requested = True
+            shutdown.set()
         except Exception as e:
             logger.error(f"Unexpected error in main loop: {e}", exc_info=True)
-            time.sleep(10)
+            shutdown.wait(10)
 
-    session_duration = time.time() - start_time
+    session_duration = time.monotonic() - start_time
     s = state.stats()
     telegram.send_message(
         f"<b>Bot stopped</b>\n"
@@ -993,6 +1344,7 @@ def main() -> None:
         f"Completed recordings: {s['completed']}"
     )
     state.save()
+    synology.close()
     logger.info(
         f"Shutdown. Uptime: {session_duration:.0f}s fragments_sent: {fragments_this_session}"
     )
@@ -2,6 +2,9 @@
 
 import json
 import os
+import shutil
+import struct
+import subprocess
 import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -15,6 +18,15 @@ from main import (
     RecordingProgress,
     Recording,
     StateManager,
+    SynologyAPI,
+    _MultipartBody,
+    _format_caption,
+    _mp4_duration,
+    idle_interval,
+    _fragment_tmp_dir,
+    get_video_duration,
+    POLL_SLACK_S,
+    poll_window,
     process_recording,
 )
 
@@ -48,9 +60,20 @@ def _make_fake_video(tmp_path: Path, name="fake.mp4") -> str:
     return str(p)
 
 
+def _make_api(tmp_path, responses=None) -> SynologyAPI:
+    """SynologyAPI with a live session; session.get returns `responses` in order."""
+    api = SynologyAPI(_make_config(tmp_path))
+    api.sid = "sid"
+    api._session_expires_at = time.monotonic() + SynologyAPI.SESSION_TTL_S
+    api.session = MagicMock()
+    if responses is not None:
+        api.session.get.side_effect = list(responses)
+    return api
+
+
 def _mock_syno(video_path: str) -> MagicMock:
     s = MagicMock()
-    s.download_fragment.return_value = video_path
+    s.download_fragment.return_value = (video_path, os.path.getsize(video_path))
     return s
 
 
@@ -94,6 +117,17 @@ class TestStateManager:
         assert p.known_duration_ms == 30000
         assert p.cycles_at_end == 1
 
+    def test_save_and_reload_without_orjson(self, tmp_path):
+        config = _make_config(tmp_path)
+        with patch("main.orjson", None):
+            state = StateManager(config)
+            state.progress["42"] = RecordingProgress(recording_id="42", next_offset_ms=5000)
+            state.mark_completed("43", reason="test")
+
+            state2 = StateManager(config)
+        assert state2.progress["42"].next_offset_ms == 5000
+        assert state2.is_completed("43")
+
     def test_mark_sent_advances_offset(self, tmp_path):
         config = _make_config(tmp_path)
         state = StateManager(config)
@@ -117,6 +151,17 @@ class TestStateManager:
         assert state.progress["1"].next_offset_ms == 5000
         assert state.progress["1"].consecutive_fails == 1
 
+    def test_mark_failed_defers_write_to_flush(self, tmp_path):
+        config = _make_config(tmp_path)
+        state = StateManager(config)
+        state.progress["1"] = RecordingProgress(recording_id="1")
+
+        state.mark_failed("1")
+        assert not Path(config.state_file).exists()
+
+        state.flush()
+        assert StateManager(config).progress["1"].consecutive_fails == 1
+
     def test_mark_completed(self, tmp_path):
         config = _make_config(tmp_path)
         state = StateManager(config)
@@ -127,6 +172,84 @@ class TestStateManager:
         assert state.is_completed("99")
         assert "99" in state.completed_ids
 
+    def test_flush_skips_write_when_clean(self, tmp_path):
+        config = _make_config(tmp_path)
+        state = StateManager(config)
+
+        state.flush()
+
+        assert not Path(config.state_file).exists()
+
+    def test_flush_writes_after_change(self, tmp_path):
+        config = _make_config(tmp_path)
+        state = StateManager(config)
+        state.get_or_create(_make_recording(rec_id="3"))
+
+        state.flush()
+
+        assert "3" in StateManager(config).progress
+
+    def test_cleanup_removes_only_stale_entries(self, tmp_path):
+        config = _make_config(tmp_path)
+        state = StateManager(config)
+        state.progress["old"] = RecordingProgress(
+            recording_id="old", last_seen_time=time.time() - 25 * 3600
+        )
+        state.progress["new"] = RecordingProgress(recording_id="new")
+
+        state.cleanup_old(24)
+
+        assert list(state.progress) == ["new"]
+        state.flush()
+        assert list(StateManager(config).progress) == ["new"]
+
+    def test_cleanup_drops_completed_ids_of_stale_entries(self, tmp_path):
+        state = StateManager(_make_config(tmp_path))
+        state.progress["old"] = RecordingProgress(
+            recording_id="old", last_seen_time=time.time() - 25 * 3600
+        )
+        state.progress["new"] = RecordingProgress(recording_id="new")
+        state.mark_completed("old")
+        state.mark_completed("new")
+        state.completed_ids.add("legacy")
+
+        state.cleanup_old(24)
+
+        assert state.completed_ids == {"new", "legacy"}
+
+    def test_cleanup_keeps_completed_ids_within_lookback(self, tmp_path):
+        state = StateManager(_make_config(tmp_path, lookback_minutes=48 * 60))
+        state.progress["old"] = RecordingProgress(
+            recording_id="old", last_seen_time=time.time() - 25 * 3600
+        )
+        state.mark_completed("old")
+
+        state.cleanup_old(24)
+
+        assert "old" not in state.progress
+        assert state.is_completed("old")
+
+    def test_cleanup_without_removals_does_not_write(self, tmp_path):
+        config = _make_config(tmp_path)
+        state = StateManager(config)
+        state.progress["1"] = RecordingProgress(recording_id="1")
+
+        state.cleanup_old(24)
+        state.flush()
+
+        assert not Path(config.state_file).exists()
+
+    def test_completed_progress_entry_loads_as_completed(self, tmp_path):
+        config = _make_config(tmp_path)
+        Path(config.state_file).write_text(json.dumps({
+            "completed_ids": [],
+            "progress": {"7": {"is_completed": True}},
+        }))
+
+        state = StateManager(config)
+
+        assert state.is_completed("7")
+
     def test_completed_ids_persist(self, tmp_path):
         config = _make_config(tmp_path)
         state = StateManager(config)
@@ -135,6 +258,17 @@ class TestStateManager:
         state2 = StateManager(config)
         assert state2.is_completed("55")
 
+    def test_stats_and_has_active(self, tmp_path):
+        state = StateManager(_make_config(tmp_path))
+        assert not state.has_active()
+
+        state.progress["1"] = RecordingProgress(recording_id="1", fragments_sent=2)
+        state.progress["2"] = RecordingProgress(recording_id="2", fragments_sent=3)
+        state.mark_completed("2")
+
+        assert state.has_active()
+        assert state.stats() == {"active": 1, "completed": 1, "fragments_total": 5}
+
 
 # ---------------------------------------------------------------------------
 # process_recording: max_fragments_per_cycle
@@ -451,6 +585,483 @@ class TestApiLoopDetection:
         assert not state.is_completed("9"), "must not be completed yet (needs stable cycles)"
 
 
+# ---------------------------------------------------------------------------
+# get_video_duration: MP4 mvhd parsing
+# ---------------------------------------------------------------------------
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _mvhd(timescale: int, duration: int, version: int = 0) -> bytes:
+    if version == 1:
+        body = struct.pack(">B3xQQIQ", 1, 0, 0, timescale, duration)
+    else:
+        body = struct.pack(">B3xIIII", 0, 0, 0, timescale, duration)
+    return _box(b"mvhd", body + b"\x00" * 80)
+
+
+def _write_mp4(tmp_path, *boxes, name="clip.mp4") -> str:
+    p = tmp_path / name
+    p.write_bytes(b"".join(boxes))
+    return str(p)
+
+
+class TestMp4Duration:
+    def test_reads_mvhd_v0(self, tmp_path):
+        path = _write_mp4(
+            tmp_path,
+            _box(b"ftyp", b"isom\x00\x00\x02\x00"),
+            _box(b"moov", _mvhd(1000, 11856)),
+            _box(b"mdat", b"\x00" * 64),
+        )
+        assert _mp4_duration(path) == pytest.approx(11.856)
+
+    def test_reads_mvhd_v1_after_mdat(self, tmp_path):
+        path = _write_mp4(
+            tmp_path,
+            _box(b"ftyp", b"isom"),
+            _box(b"mdat", b"\x00" * 4096),
+            _box(b"moov", _box(b"udta", b"") + _mvhd(90000, 900000, version=1)),
+        )
+        assert _mp4_duration(path) == pytest.approx(10.0)
+
+    def test_fragmented_with_samples_in_moov_is_unusable(self, tmp_path):
+        # frag_keyframe without empty_moov: mvhd covers only the first fragment
+        moof = _box(b"moof", b"\x00" * 16) + _box(b"mdat", b"\x00" * 64)
+        path = _write_mp4(
+            tmp_path,
+            _box(b"moov", _mvhd(1000, 2000) + _box(b"mvex", _box(b"trex", b"\x00" * 24))),
+            _box(b"mdat", b"\x00" * 64),
+            *[moof] * 4,
+        )
+        assert _mp4_duration(path) is None
+
+    def test_zero_duration_is_unusable(self, tmp_path):
+        path = _write_mp4(tmp_path, _box(b"moov", _mvhd(1000, 0)))
+        assert _mp4_duration(path) is None
+
+    def test_non_mp4_is_unusable(self, tmp_path):
+        assert _mp4_duration(_make_fake_video(tmp_path)) is None
+
+    def test_truncated_moov_is_unusable(self, tmp_path):
+        data = _box(b"moov", _mvhd(1000, 5000))
+        path = _write_mp4(tmp_path, data[:20])
+        assert _mp4_duration(path) is None
+
+    def test_get_video_duration_prefers_ffprobe(self, tmp_path):
+        path = _write_mp4(tmp_path, _box(b"moov", _mvhd(1000, 7500)))
+        probe = MagicMock(returncode=0, stdout="7.48\n", stderr="")
+        with patch("main.subprocess.run", return_value=probe) as run:
+            assert get_video_duration(path) == (7.48, True)
+        run.assert_called_once()
+
+    @pytest.mark.parametrize("error", [FileNotFoundError, subprocess.TimeoutExpired("ffprobe", 10)])
+    def test_get_video_duration_falls_back_to_mvhd(self, tmp_path, error):
+        path = _write_mp4(tmp_path, _box(b"moov", _mvhd(1000, 7500)))
+        with patch("main.subprocess.run", side_effect=error):
+            assert get_video_duration(path) == (7.5, True)
+
+    def test_known_size_skips_stat(self, tmp_path):
+        path = _write_mp4(tmp_path, _box(b"moov", _mvhd(1000, 7500)))
+        size = os.path.getsize(path)
+        with patch("main.subprocess.run", side_effect=FileNotFoundError), \
+                patch("main.os.stat") as stat, patch("main.os.fstat") as fstat:
+            assert get_video_duration(path, size) == (7.5, True)
+        stat.assert_not_called()
+        fstat.assert_not_called()
+
+
+# Encoder-produced files (ffmpeg 7.0.2, libx264/aac, testsrc/sine), e.g.
+#   ffmpeg -f lavfi -i testsrc=size=64x36:rate=10 -t 1.7 -c:v libx264
+#          -pix_fmt yuv420p -movflags +faststart ffmpeg_h264_faststart.mp4
+# Expected values are libavformat's duration for each file; None means the
+# mvhd carries no usable duration (fragmented MP4). None of these come from a
+# Synology DSM; until a real Recording.Download sample is added here and
+# passes test_fixture_matches_ffprobe, mvhd stays a fallback behind ffprobe.
+FIXTURES = Path(__file__).parent / "fixtures"
+FIXTURE_DURATIONS = {
+    "ffmpeg_h264_aac.mp4": 2.3,          # video + audio, moov after mdat
+    "ffmpeg_h264_faststart.mp4": 1.7,    # moov before mdat
+    "ffmpeg_h264_fragmented.mp4": None,  # frag_keyframe+empty_moov
+    "ffmpeg_h264_frag_keyframe.mp4": None,  # frag_keyframe, -g 5: samples in moov
+}
+
+
+class TestMp4DurationFixtures:
+    @pytest.mark.parametrize("name,expected", sorted(FIXTURE_DURATIONS.items()))
+    def test_fixture_duration(self, name, expected):
+        dur = _mp4_duration(str(FIXTURES / name))
+        if expected is None:
+            assert dur is None
+        else:
+            assert dur == pytest.approx(expected, abs=1e-3)
+
+    @pytest.mark.skipif(shutil.which("ffprobe") is None, reason="ffprobe not installed")
+    @pytest.mark.parametrize("path", sorted(FIXTURES.glob("*.mp4")), ids=lambda p: p.name)
+    def test_fixture_matches_ffprobe(self, path):
+        probe = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", str(path)],
+            capture_output=True, text=True, check=True,
+        )
+        dur = _mp4_duration(str(path))
+        # None is safe: get_video_duration then reports no duration
+        if dur is not None:
+            assert dur == pytest.approx(float(probe.stdout), abs=1e-3)
+
+
+# ---------------------------------------------------------------------------
+# get_video_duration: ffprobe
+# ---------------------------------------------------------------------------
+
+class TestProbeDuration:
+    def _ffprobe(self, stdout="12.5\n", returncode=0):
+        r = MagicMock()
+        r.returncode = returncode
+        r.stdout = stdout
+        r.stderr = ""
+        return r
+
+    def test_single_uncapped_probe(self, tmp_path):
+        video = _make_fake_video(tmp_path)
+        with patch("main.subprocess.run", return_value=self._ffprobe()) as run:
+            assert get_video_duration(video) == (12.5, True)
+        assert run.call_count == 1
+        assert "-probesize" not in run.call_args[0][0]
+
+    @pytest.mark.parametrize("stdout,returncode", [("", 1), ("N/A\n", 0)])
+    def test_failed_probe_is_not_retried(self, tmp_path, stdout, returncode):
+        video = _make_fake_video(tmp_path)
+        with patch("main.subprocess.run",
+                   return_value=self._ffprobe(stdout, returncode)) as run:
+            assert get_video_duration(video) == (0.0, False)
+        assert run.call_count == 1
+
+
+# ---------------------------------------------------------------------------
+# _format_caption
+# ---------------------------------------------------------------------------
+
+class TestFormatCaption:
+    def test_date_and_time_use_fragment_offset(self):
+        rec = _make_recording()
+        rec.start_time = int(time.mktime((2024, 3, 5, 12, 0, 0, 0, 0, -1)))
+
+        caption = _format_caption(rec, "Cam1", 2, 75.0, 10.0)
+
+        assert "<b>Date:</b> 05.03.2024" in caption
+        assert "<b>Time:</b> 12:01:15" in caption
+        assert "<b>Position:</b> 75s - 85s" in caption
+
+
+# ---------------------------------------------------------------------------
+# poll_window: incremental polling
+# ---------------------------------------------------------------------------
+
+class TestPollWindow:
+    def test_first_poll_uses_full_lookback(self, tmp_path):
+        config = _make_config(tmp_path, lookback_minutes=30)
+        state = StateManager(config)
+
+        assert poll_window(state, config, 10000, None) == (10000 - 1800, 10000)
+
+    def test_idle_narrows_to_last_poll(self, tmp_path):
+        config = _make_config(tmp_path, lookback_minutes=30)
+        state = StateManager(config)
+
+        from_time, to_time = poll_window(state, config, 10000, 9970)
+
+        assert from_time == 9970 - POLL_SLACK_S
+        assert to_time == 10000
+
+    def test_active_recording_keeps_full_lookback(self, tmp_path):
+        config = _make_config(tmp_path, lookback_minutes=30)
+        state = StateManager(config)
+        state.progress["1"] = RecordingProgress(recording_id="1")
+
+        assert poll_window(state, config, 10000, 9970) == (10000 - 1800, 10000)
+
+
+# ---------------------------------------------------------------------------
+# idle_interval: adaptive polling
+# ---------------------------------------------------------------------------
+
+class TestIdleInterval:
+    def test_disabled_by_default(self, tmp_path):
+        config = _make_config(tmp_path, check_interval=30)
+        assert idle_interval(config, 10) == 30
+
+    def test_doubles_per_idle_cycle_up_to_ceiling(self, tmp_path):
+        config = _make_config(tmp_path, check_interval=30, idle_max_interval=300)
+        assert [idle_interval(config, n) for n in range(6)] == [30, 60, 120, 240, 300, 300]
+
+    def test_long_idle_does_not_overflow(self, tmp_path):
+        config = _make_config(tmp_path, check_interval=30, idle_max_interval=300)
+        assert idle_interval(config, 10**6) == 300
+
+
+# ---------------------------------------------------------------------------
+# SynologyAPI: reusable fragment file
+# ---------------------------------------------------------------------------
+
+class TestFragmentBuffer:
+    def _video(self, payload=b""):
+        r = MagicMock()
+        r.status_code = 200
+        r.headers = {"Content-Type": "video/mp4"}
+        r.iter_content.return_value = [payload]
+        return r
+
+    def test_reuses_same_file_between_downloads(self, tmp_path):
+        api = _make_api(tmp_path, [self._video(b"a" * 100), self._video(b"b" * 10)])
+        try:
+            first, _ = api.download_fragment("1", 0, 10000)
+            api.release_fragment(first)
+            second, size = api.download_fragment("1", 10000, 10000)
+
+            assert first == second
+            assert Path(second).read_bytes() == b"b" * 10
+            assert size == 10
+        finally:
+            api.close()
+
+    def test_partial_download_over_threshold_is_kept(self, tmp_path):
+        from requests.exceptions import ChunkedEncodingError
+
+        def broken_stream(chunk_size):
+            yield b"a" * 150000
+            raise ChunkedEncodingError("IncompleteRead")
+
+        resp = self._video()
+        resp.iter_content.side_effect = broken_stream
+        api = _make_api(tmp_path, [resp])
+        try:
+            path, size = api.download_fragment("1", 0, 10000)
+            assert size == os.path.getsize(path) == 150000
+        finally:
+            api.close()
+
+    def test_buffer_creation_error_returns_none(self, tmp_path):
+        api = _make_api(tmp_path, [self._video(b"a" * 100)])
+        with patch("main.tempfile.NamedTemporaryFile", side_effect=OSError("read-only")):
+            assert api.download_fragment("1", 0, 10000) is None
+        api.session.get.assert_not_called()
+
+    def test_release_truncates_but_keeps_file(self, tmp_path):
+        api = _make_api(tmp_path, [self._video(b"a" * 100)])
+        try:
+            path, _ = api.download_fragment("1", 0, 10000)
+            api.release_fragment(path)
+
+            assert os.path.exists(path)
+            assert os.path.getsize(path) == 0
+        finally:
+            api.close()
+        assert not os.path.exists(path)
+
+
+class TestFragmentTmpDir:
+    def _statvfs(self, free_bytes):
+        st = MagicMock()
+        st.f_frsize = 4096
+        st.f_bavail = free_bytes // 4096
+        return st
+
+    def test_uses_shm_when_it_has_room(self):
+        with patch("main.os.statvfs", return_value=self._statvfs(64 << 20)), \
+             patch("main.os.access", return_value=True):
+            assert _fragment_tmp_dir(50 << 20) == "/dev/shm"
+
+    def test_falls_back_to_tmp_when_shm_is_small(self):
+        with patch("main.os.statvfs", return_value=self._statvfs(32 << 20)), \
+             patch("main.os.access", return_value=True):
+            assert _fragment_tmp_dir(50 << 20) == "/tmp"
+
+    def test_falls_back_to_tmp_without_shm(self):
+        with patch("main.os.statvfs", side_effect=FileNotFoundError):
+            assert _fragment_tmp_dir(50 << 20) == "/tmp"
+
+
+# ---------------------------------------------------------------------------
+# SynologyAPI: session expiry
+# ---------------------------------------------------------------------------
+
+class TestEnsureSession:
+    def test_live_session_does_not_login(self, tmp_path):
+        api = SynologyAPI(_make_config(tmp_path))
+        api.sid = "sid"
+        api._session_expires_at = time.monotonic() + 60
+
+        with patch.object(SynologyAPI, "login") as login:
+            assert api.ensure_session() is True
+        login.assert_not_called()
+
+    def test_expired_session_logs_in_again(self, tmp_path):
+        api = SynologyAPI(_make_config(tmp_path))
+        api.sid = "sid"
+        api._session_expires_at = time.monotonic() - 1
+
+        with patch.object(SynologyAPI, "login", return_value=True) as login:
+            assert api.ensure_session() is True
+        login.assert_called_once()
+
+    def test_missing_sid_logs_in(self, tmp_path):
+        api = SynologyAPI(_make_config(tmp_path))
+        api._session_expires_at = time.monotonic() + 60
+
+        with patch.object(SynologyAPI, "login", return_value=False) as login:
+            assert api.ensure_session() is False
+        login.assert_called_once()
+
+    def test_login_retries_non_json_response(self, tmp_path):
+        from tenacity import wait_none
+
+        api = SynologyAPI(_make_config(tmp_path))
+        html_page = MagicMock(content=b"<html>DSM is starting</html>")
+        ok = MagicMock(content=json.dumps({"success": True, "data": {"sid": "s1"}}).encode())
+        api.session = MagicMock()
+        api.session.get.side_effect = [html_page, ok]
+
+        with patch.object(SynologyAPI.login.retry, "wait", wait_none()):
+            assert api.login() is True
+        assert api.sid == "s1"
+
+
+# ---------------------------------------------------------------------------
+# SynologyAPI: unchanged recordings list
+# ---------------------------------------------------------------------------
+
+class TestRecordingsDigest:
+    def _list(self, *ids):
+        return MagicMock(content=json.dumps({
+            "success": True,
+            "data": {"recordings": [
+                {"id": i, "cameraId": 1, "startTime": 1000, "duration": 30} for i in ids
+            ]},
+        }).encode())
+
+    def test_identical_body_is_not_parsed_again(self, tmp_path):
+        api = _make_api(tmp_path, [self._list(1, 2), self._list(1, 2)])
+
+        first = api.get_recordings(camera_id="1")
+        with patch("main._json_loads") as loads:
+            second = api.get_recordings(camera_id="1")
+
+        assert loads.call_count == 0
+        assert [r.id for r in second] == [r.id for r in first] == ["1", "2"]
+
+    def test_changed_body_is_parsed(self, tmp_path):
+        api = _make_api(tmp_path, [self._list(1), self._list(1, 2)])
+
+        api.get_recordings(camera_id="1")
+        recordings = api.get_recordings(camera_id="1")
+
+        assert [r.id for r in recordings] == ["1", "2"]
+
+    def test_api_error_returns_none_and_drops_session(self, tmp_path):
+        body = json.dumps({"success": False, "error": {"code": 119}}).encode()
+        api = _make_api(tmp_path, [MagicMock(content=body)])
+
+        assert api.get_recordings(camera_id="1") is None
+        assert api.sid is None
+
+    def test_login_failure_returns_none(self, tmp_path):
+        api = _make_api(tmp_path, [])
+        api.sid = None
+        with patch.object(SynologyAPI, "login", return_value=False):
+            assert api.get_recordings(camera_id="1") is None
+
+
+# ---------------------------------------------------------------------------
+# SynologyAPI: camera list TTL
+# ---------------------------------------------------------------------------
+
+class TestCameraCache:
+    def _cameras(self, *cameras):
+        return MagicMock(content=json.dumps({
+            "success": True,
+            "data": {"cameras": list(cameras)},
+        }).encode())
+
+    def test_name_is_cached_within_ttl(self, tmp_path):
+        api = _make_api(tmp_path)
+        api.session.get.return_value = self._cameras({"id": 1, "newName": "Front"})
+
+        assert api.get_camera_name("1") == "Front"
+        assert api.get_camera_name("1") == "Front"
+        assert api.session.get.call_count == 1
+
+    def test_name_is_refreshed_after_ttl(self, tmp_path):
+        api = _make_api(tmp_path)
+        api.session.get.return_value = self._cameras({"id": 1, "newName": "Front"})
+        api.get_camera_name("1")
+
+        api._cameras_fetched_at -= SynologyAPI.CAMERAS_TTL_S
+        api.session.get.return_value = self._cameras({"id": 1, "newName": "Garage"})
+
+        assert api.get_camera_name("1") == "Garage"
+        assert api.session.get.call_count == 2
+
+    def test_failed_refresh_keeps_previous_name(self, tmp_path):
+        api = _make_api(tmp_path)
+        api.session.get.return_value = self._cameras({"id": 1, "newName": "Front"})
+        api.get_camera_name("1")
+        api._cameras_fetched_at -= SynologyAPI.CAMERAS_TTL_S
+
+        with patch.object(SynologyAPI, "get_cameras", side_effect=RuntimeError("down")):
+            assert api.get_camera_name("1") == "Front"
+            assert api.get_camera_name("1") == "Front"
+            assert SynologyAPI.get_cameras.call_count == 1
+
+    def test_empty_new_name_falls_back_to_name(self, tmp_path):
+        api = _make_api(tmp_path)
+        api.session.get.return_value = self._cameras(
+            {"id": 1, "newName": "", "name": "Porch"},
+            {"id": 2},
+        )
+
+        assert api.get_camera_name("1") == "Porch"
+        assert api.get_camera_name("2") == "Camera 2"
+
+
+# ---------------------------------------------------------------------------
+# TelegramBot: streamed multipart upload
+# ---------------------------------------------------------------------------
+
+class TestMultipartBody:
+    def test_body_matches_content_length_and_parses(self, tmp_path):
+        from email.parser import BytesParser
+
+        video = tmp_path / "clip.mp4"
+        video.write_bytes(b"\x01\x02" * 300000)
+        body = _MultipartBody(
+            {"chat_id": "1", "caption": "Камера 1", "supports_streaming": True},
+            "video",
+            str(video),
+        )
+
+        data = b"".join(body)
+        assert len(data) == len(body)
+
+        msg = BytesParser().parsebytes(
+            f"Content-Type: {body.content_type}\r\n\r\n".encode() + data
+        )
+        parts = {p.get_param("name", header="content-disposition"): p for p in msg.get_payload()}
+        assert parts["chat_id"].get_payload() == "1"
+        assert parts["caption"].get_payload(decode=True).decode() == "Камера 1"
+        assert parts["supports_streaming"].get_payload() == "true"
+        assert parts["video"].get_filename() == "clip.mp4"
+        assert parts["video"].get_payload(decode=True) == video.read_bytes()
+
+    def test_body_can_be_iterated_again_for_retries(self, tmp_path):
+        video = tmp_path / "clip.mp4"
+        video.write_bytes(b"abc")
+        body = _MultipartBody({"chat_id": "1"}, "video", str(video))
+
+        assert b"".join(body) == b"".join(body)
+
+
 # ---------------------------------------------------------------------------
 # TelegramBot: 429 retry
 # ---------------------------------------------------------------------------
@@ -462,6 +1073,9 @@ class TestTelegramRateLimit:
         bot.token = "x"
         bot.chat_id = "1"
         bot.base_url = "https://api.telegram.org/botx"
+        bot._send_message_url = f"{bot.base_url}/sendMessage"
+        bot._send_video_url = f"{bot.base_url}/sendVideo"
+        bot._video_data = {"chat_id": "1", "supports_streaming": True, "parse_mode": "HTML"}
         bot.bot_name = "TestBot"
         return bot
 
@@ -491,6 +1105,9 @@ class TestTelegramRateLimit:
         assert result is True
         assert session.post.call_count == 2
         mock_sleep.assert_called_once_with(1)
+        args, kwargs = session.post.call_args
+        assert args[0] == "https://api.telegram.org/botx/sendVideo"
+        assert kwargs["headers"]["Content-Type"] == kwargs["data"].content_type
 
     def test_returns_false_after_all_429s(self, tmp_path):
         bot = self._make_bot()